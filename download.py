@@ -1,37 +1,185 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError
+from urllib3.util.retry import Retry
+from lxml import html as lhtml
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.styles import getSampleStyleSheet
-import sys
+from pypdf import PdfWriter
+import argparse
+import functools
+import importlib.util
 import os
+import io
 from urllib.parse import urljoin, urlparse, parse_qs
 import re
-import html
+import tempfile
 import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 # List of URL endings to ignore
 IGNORED_URL_ENDINGS = ["/cs"]
 # Delay between downloads in seconds
 DOWNLOAD_DELAY = .1
+# Number of wiki pages per generated PDF
+PAGES_PER_PDF = 100
+# Number of pages downloaded in parallel
+MAX_WORKERS = 8
+# Number of pages handled per worker task. TextExtracts still answers with one page per
+# request, so a batch saves HTML downloads and parsing, not requests.
+EXTRACT_BATCH_SIZE = 20
+# Number of page batches queued on the workers at a time
+MAX_PENDING_BATCHES = MAX_WORKERS * 2
+
+# Buffer size for reading and writing cached text files
+CACHE_BUFFER_SIZE = 1 << 20
+# Permissions a cached text file would get from a plain open(), i.e. 0o666 minus the umask.
+# The umask can only be read by setting it, so this is done once at import time.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_CACHE_FILE_MODE = 0o666 & ~_UMASK
+
+# Characters that are not allowed in filenames
+_SANITIZE_RE = re.compile(r'[:\\/*?"<>|]')
+# Same replacements as html.escape, applied with a single str.translate
+_ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#x27;'})
+# Blank lines separating paragraphs in the cached text
+_PARA_SPLIT = re.compile(r'\n\s*\n')
+
+# Elements that are not part of the article text, as "tag" or "tag.class" selectors
+_UNWANTED_SEL = ('div.toc, div.navbox, div.infobox, div.reflist, div.mw-references-columns, span.mw-editsection, '
+                 'div.gallery, div.thumb, table.infobox, table.navbox, ul.gallery, ol.references, img, figure, '
+                 'style, script')
+
+def _selector_to_xpath(selector):
+    """Translates a "tag" or "tag.class" selector into an XPath test on the current node."""
+    tag, _, css_class = selector.strip().partition('.')
+    if not css_class:
+        return f"self::{tag}"
+    # Match whole class names only, like a CSS class selector does
+    return f"(self::{tag} and contains(concat(' ', normalize-space(@class), ' '), ' {css_class} '))"
+
+# Collects the text of a content element, skipping text inside any unwanted element.
+# Compiled once so the filter runs entirely inside libxml2.
+EXTRACTOR = lhtml.etree.XPath(".//text()[not(ancestor::*[{}])]".format(
+    " or ".join(_selector_to_xpath(selector) for selector in _UNWANTED_SEL.split(','))))
+
+# Shared session so every request reuses pooled keep-alive connections
+SESSION = requests.Session()
+SESSION.headers.update({'User-Agent': 'WikiToPDF/3.0'})
+# Brotli roughly halves transfer sizes again over gzip, but urllib3 can only decode it
+# when the brotli or brotlicffi package is installed
+if importlib.util.find_spec("brotli") or importlib.util.find_spec("brotlicffi"):
+    SESSION.headers['Accept-Encoding'] = 'br, gzip, deflate'
+else:
+    SESSION.headers['Accept-Encoding'] = 'gzip, deflate'
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32,
+                       max_retries=Retry(total=3, backoff_factor=0.5))
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
+class RateLimiter:
+    """Token bucket shared across threads to keep downloads polite."""
+
+    def __init__(self, rate, capacity):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (int): Maximum number of tokens that can be banked for bursts.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available, then consumes it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+# Limits all workers combined to one download per DOWNLOAD_DELAY on average
+RATE_LIMITER = RateLimiter(1 / DOWNLOAD_DELAY, MAX_WORKERS)
 
 def sanitize_filename(filename):
     """Sanitizes a string to be a valid filename."""
-    return re.sub(r'[:\\/*?"<>|]', "_", filename)
+    return _SANITIZE_RE.sub("_", filename)
 
-def get_all_page_urls(base_url):
+def _scrape_all_pages(base_url, session=SESSION):
+    """
+    Gets all page URLs by scraping Special:AllPages, for wikis whose API is unavailable.
+
+    Args:
+        base_url (str): The base URL of the wiki.
+        session (requests.Session): The session used for HTTP requests.
+
+    Returns:
+        list: A (title, full URL) tuple for each page in the wiki.
+    """
+    index_url = urljoin(base_url, "index.php")
+    listing_url = f"{index_url}?title=Special:AllPages"
+    seen_titles = set()
+    page_urls = []
+
+    while listing_url:
+        try:
+            RATE_LIMITER.acquire()
+            response = session.get(listing_url)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"Error loading {listing_url}: {e}")
+            break
+
+        tree = lhtml.fromstring(response.content)
+        titles = tree.xpath("//ul[contains(@class,'mw-allpages-chunk')]/li/a/@title")
+        new_titles = [title for title in titles if title not in seen_titles]
+        # A listing page without new titles means the navigation led back to pages already seen
+        if not new_titles:
+            break
+        for title in new_titles:
+            seen_titles.add(title)
+            page_urls.append((title, f"{index_url}?title={title.replace(' ', '_')}"))
+
+        # The navigation may hold both a previous and a next link; the next one
+        # is the one that starts after the last title of this listing page
+        current_url, listing_url = listing_url, None
+        for href in tree.xpath("//div[contains(@class,'mw-allpages-nav')]/a/@href"):
+            start_title = parse_qs(urlparse(href).query).get("from", [""])[0].replace('_', ' ')
+            if start_title > titles[-1]:
+                listing_url = urljoin(current_url, href)
+                print("  ...continuing with next batch of pages.")
+                break
+
+    return page_urls
+
+def get_all_page_urls(base_url, session=SESSION):
     """
     Gets all page URLs from a MediaWiki site using the API.
+    Falls back to scraping Special:AllPages when the API is unavailable, i.e. the
+    first request fails with an HTTP error or does not answer with JSON.
 
     Args:
         base_url (str): The base URL of the wiki (e.g., https://en.wikipedia.org).
+        session (requests.Session): The session used for HTTP requests.
 
     Returns:
-        list: A list of full URLs for all pages in the wiki.
+        tuple: (list of (title, full URL) tuples for each page in the wiki,
+                whether the API is available)
     """
     api_url = urljoin(base_url, "api.php")
     page_urls = []
+    api_available = True
     params = {
         "action": "query",
         "format": "json",
@@ -43,152 +191,304 @@ def get_all_page_urls(base_url):
 
     while True:
         try:
-            response = requests.get(api_url, params=params)
+            response = session.get(api_url, params=params)
             response.raise_for_status()
             data = response.json()
+        # Checked first because requests' JSON and HTTP errors are also RequestExceptions
+        except (json.JSONDecodeError, requests.exceptions.HTTPError) as e:
+            if page_urls:
+                print(f"Error querying API: {e}")
+            else:
+                print(f"API unavailable ({e}), falling back to scraping Special:AllPages.")
+                page_urls = _scrape_all_pages(base_url, session)
+                api_available = False
+            break
         except requests.exceptions.RequestException as e:
             print(f"Error querying API: {e}")
             break
-        except json.JSONDecodeError:
-            print("Error decoding JSON from API response.")
-            break
 
         pages = data.get("query", {}).get("allpages", [])
         for page in pages:
             title = page["title"]
             page_url = urljoin(api_url, f"index.php?title={title.replace(' ', '_')}")
-            page_urls.append(page_url)
+            page_urls.append((title, page_url))
 
         if "continue" in data:
-            params["apcontinue"] = data["continue"]["apcontinue"]
+            # Carries over both "continue" and "apcontinue", as the API expects
+            params.update(data["continue"])
             print(f"  ...continuing with next batch of pages.")
-            time.sleep(DOWNLOAD_DELAY)
         else:
             break
     
     # Filter out ignored URLs
-    filtered_urls = [url for url in page_urls if not any(url.endswith(ending) for ending in IGNORED_URL_ENDINGS)]
+    filtered_urls = [(title, url) for title, url in page_urls
+                     if not any(url.endswith(ending) for ending in IGNORED_URL_ENDINGS)]
     print(f"Found {len(page_urls)} pages, {len(filtered_urls)} after filtering.")
 
-    return filtered_urls
+    return filtered_urls, api_available
+
+def get_cache_filename(page_title):
+    """Returns the name of the text file a page is cached in."""
+    return f"{sanitize_filename(page_title)}.txt"
+
+def read_cached_text(filepath):
+    """Reads a cached page's text in one buffered binary read."""
+    with open(filepath, 'rb', buffering=CACHE_BUFFER_SIZE) as f:
+        return f.read().decode('utf-8')
+
+def write_cached_text(filepath, text):
+    """
+    Writes a page's text to the cache, encoding it once up front.
+    The file is written under a unique temporary name and then renamed, so an
+    interrupted run never leaves a partially written page in the cache, and
+    threads saving titles that sanitize to the same filename never collide.
+    """
+    fd, temp_filepath = tempfile.mkstemp(dir=os.path.dirname(filepath), suffix=".part")
+    try:
+        try:
+            f = open(fd, 'wb', buffering=CACHE_BUFFER_SIZE)
+        except BaseException:
+            os.close(fd)
+            raise
+        with f:
+            f.write(text.encode('utf-8'))
+        # mkstemp creates owner-only files; give the cache file the usual permissions
+        os.chmod(temp_filepath, _CACHE_FILE_MODE)
+        os.replace(temp_filepath, filepath)
+    except BaseException:
+        os.remove(temp_filepath)
+        raise
+
+def get_page_extracts(api_url, page_titles, session=SESSION):
+    """
+    Gets the plain text of several pages using the MediaWiki TextExtracts API,
+    so no HTML has to be downloaded or parsed.
+
+    Args:
+        api_url (str): The URL of the wiki's api.php.
+        page_titles (list): Up to EXTRACT_BATCH_SIZE page titles.
+        session (requests.Session): The session used for HTTP requests.
+
+    Returns:
+        dict: The text of each requested title. Titles the API returned no text for
+              (e.g. wikis without the TextExtracts extension) are left out.
+    """
+    params = {
+        "action": "query",
+        "format": "json",
+        "prop": "extracts",
+        "explaintext": 1,
+        "exsectionformat": "plain",
+        "exlimit": "max",
+        "redirects": 1,
+        "titles": "|".join(page_titles)
+    }
+    normalized = {}
+    redirects = {}
+    texts = {}
+
+    # Whole-article extracts come back one per response, the rest through continuation
+    while True:
+        try:
+            RATE_LIMITER.acquire()
+            response = session.get(api_url, params=params)
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"  Error querying extracts API: {e}")
+            break
+        except json.JSONDecodeError:
+            print("  Error decoding JSON from extracts API response.")
+            break
+
+        query = data.get("query", {})
+        normalized.update((n["from"], n["to"]) for n in query.get("normalized", []))
+        redirects.update((r["from"], r["to"]) for r in query.get("redirects", []))
+        texts.update((page["title"], page["extract"]) for page in query.get("pages", {}).values()
+                     if "extract" in page)
 
-def get_page_content_and_save(page_url, cache_folder, force_download=False):
+        if "continue" in data:
+            # Carries over both "continue" and "excontinue", as the API expects
+            params.update(data["continue"])
+        else:
+            break
+
+    # The API answers with normalized and redirect-resolved titles, so map them back to the requested ones
+    extracts = {}
+    for title in page_titles:
+        resolved_title = normalized.get(title, title)
+        resolved_title = redirects.get(resolved_title, resolved_title)
+        if resolved_title in texts:
+            extracts[title] = texts[resolved_title]
+
+    return extracts
+
+def get_page_content_and_save(page_url, page_title, cache_folder, cached, force_download=False, session=SESSION, page_text=None):
     """
     Gets the content of a single page, either from cache or by downloading.
     Saves the content to a text file.
 
     Args:
         page_url (str): The URL of the page to process.
+        page_title (str): The title of the page.
         cache_folder (str): The path to the folder where text files are stored.
+        cached (set): Names of the files in the cache folder. Updated when a page is saved.
         force_download (bool): If True, always downloads the page even if it exists in cache.
+        session (requests.Session): The session used for HTTP requests.
+        page_text (str): Text already fetched through the extracts API. When given,
+                         it is saved as is instead of downloading the page's HTML.
 
     Returns:
         tuple: (page_title, page_text_content)
     """
-    parsed_url = urlparse(page_url)
-    query_params = parse_qs(parsed_url.query)
-    if 'title' in query_params:
-        page_title = query_params['title'][0].replace('_', ' ')
-    else:
-        page_title = page_url.split('/')[-1].replace('_', ' ') # Fallback
-
-    sanitized_title = sanitize_filename(page_title)
-    filepath = os.path.join(cache_folder, f"{sanitized_title}.txt")
+    filename = get_cache_filename(page_title)
+    filepath = os.path.join(cache_folder, filename)
 
-    if not force_download and os.path.exists(filepath):
+    if not force_download and filename in cached:
         print(f"  Loading from cache: {page_title}")
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return page_title, f.read()
+        return page_title, read_cached_text(filepath)
+
+    if page_text is not None:
+        write_cached_text(filepath, page_text)
+        cached.add(filename)
+        return page_title, page_text
 
     print(f"  Downloading: {page_url}")
     try:
-        time.sleep(DOWNLOAD_DELAY)
-        headers = {'User-Agent': 'WikiToPDF/3.0'}
-        response = requests.get(page_url, headers=headers)
-        response.raise_for_status()
+        RATE_LIMITER.acquire()
+        response = session.get(page_url, stream=True)
     except requests.exceptions.RequestException as e:
         print(f"  Error downloading page {page_url}: {e}")
         return page_title, ""
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-    content_div = soup.find(id="mw-content-text")
-    if not content_div:
-        # Fallback for wikis that might not have mw-content-text
-        content_div = soup.find('div', class_='mw-parser-output')
-        if not content_div:
+    # Parse straight from the socket instead of building the whole page as bytes and str first.
+    # MediaWiki always serves UTF-8, and a parser must not be shared between threads.
+    # The response is closed on every path so its connection goes back to the pool.
+    with response:
+        try:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            tree = lhtml.parse(response.raw, lhtml.HTMLParser(encoding='utf-8')).getroot()
+        except (requests.exceptions.RequestException, HTTPError) as e:
+            print(f"  Error downloading page {page_url}: {e}")
             return page_title, ""
+    if tree is None:
+        return page_title, ""
 
-    # Remove unwanted elements
-    for unwanted in content_div.find_all(['div', 'table', 'ul', 'ol', 'span', 'img', 'figure'],
-                                         class_=['toc', 'navbox', 'infobox', 'reflist',
-                                                 'mw-references-columns', 'mw-editsection', 'gallery', 'thumb']):
-        unwanted.decompose()
+    content_div = tree.get_element_by_id("mw-content-text", None)
+    if content_div is None:
+        # Fallback for wikis that might not have mw-content-text
+        content_div = next(iter(tree.find_class('mw-parser-output')), None)
+        if content_div is None:
+            return page_title, ""
 
-    page_text = content_div.get_text()
+    page_text = ''.join(EXTRACTOR(content_div))
 
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(page_text)
+    write_cached_text(filepath, page_text)
+    cached.add(filename)
 
     return page_title, page_text
 
-def create_pdf_from_cache(cache_folder, pdf_output_folder, styles):
+@functools.lru_cache(maxsize=None)
+def _page_styles():
+    """Returns the heading and body styles, building the stylesheet once per process."""
+    styles = getSampleStyleSheet()
+    return styles['h1'], styles['BodyText']
+
+def build_page_pdf(cache_folder, filename):
     """
-    Creates PDFs from the text files in the cache folder, with 100 pages per PDF.
+    Lays out a single cached page as a standalone PDF.
+    Runs in a worker process, so it uses that process's own stylesheet.
 
     Args:
         cache_folder (str): The path to the folder where text files are stored.
+        filename (str): The name of the page's text file.
+
+    Returns:
+        bytes: The PDF, or None if it could not be built.
+    """
+    h1_style, body_style = _page_styles()
+
+    page_title = os.path.splitext(filename)[0]
+    content = read_cached_text(os.path.join(cache_folder, filename))
+
+    story = [Paragraph(page_title.translate(_ESCAPE_TABLE), h1_style), Spacer(1, 18)]
+
+    # Escape the whole page once rather than each paragraph separately
+    for para_text in _PARA_SPLIT.split(content.translate(_ESCAPE_TABLE)):
+        para_text = para_text.strip()
+        if para_text:
+            story.append(Paragraph(para_text, body_style))
+            story.append(Spacer(1, 8))
+
+    buffer = io.BytesIO()
+    try:
+        SimpleDocTemplate(buffer, pagesize=letter).build(story)
+    except Exception as e:
+        print(f"  Error building PDF page {page_title}: {e}")
+        return None
+    return buffer.getvalue()
+
+def write_chunk_pdf(chunk_files, page_futures, pdf_output_folder):
+    """
+    Concatenates the PDFs of a chunk of pages into one PDF file.
+
+    Args:
+        chunk_files (list): The names of the text files in the chunk, in order.
+        page_futures (list): Futures resolving to each page's PDF, in the same order.
         pdf_output_folder (str): The path to the folder where PDFs will be saved.
-        styles (StyleSheet): The stylesheet to use for the PDF.
     """
-    text_files = sorted([f for f in os.listdir(cache_folder) if f.endswith(".txt")])
-    
-    for i in range(0, len(text_files), 100):
-        chunk = text_files[i:i+100]
-        
-        if not chunk:
-            continue
-
-        first_file_name = os.path.splitext(chunk[0])[0]
-        last_file_name = os.path.splitext(chunk[-1])[0]
-        
-        pdf_filename = f"{first_file_name}_to_{last_file_name}.pdf"
-        pdf_filepath = os.path.join(pdf_output_folder, pdf_filename)
-        
-        doc = SimpleDocTemplate(pdf_filepath, pagesize=letter)
-        story = []
-        
-        print(f"\nCreating PDF: {pdf_filename}")
-        
-        for filename in chunk:
-            page_title = os.path.splitext(filename)[0]
-            filepath = os.path.join(cache_folder, filename)
-
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            story.append(Paragraph(html.escape(page_title), styles['h1']))
-            story.append(Spacer(1, 18))
-
-            for para_text in content.split('\n\n'):
-                para_text = para_text.strip()
-                if para_text:
-                    story.append(Paragraph(html.escape(para_text), styles['BodyText']))
-                    story.append(Spacer(1, 8))
-            
-            story.append(PageBreak())
-            
-        try:
-            doc.build(story)
-            print(f"  Successfully created: {pdf_filename}")
-        except Exception as e:
-            print(f"  Error building PDF {pdf_filename}: {e}")
+    first_file_name = os.path.splitext(chunk_files[0])[0]
+    last_file_name = os.path.splitext(chunk_files[-1])[0]
+
+    pdf_filename = f"{first_file_name}_to_{last_file_name}.pdf"
+    pdf_filepath = os.path.join(pdf_output_folder, pdf_filename)
+
+    print(f"\nCreating PDF: {pdf_filename}")
 
-def download_entire_wiki_to_pdf(base_url):
+    writer = PdfWriter()
+    try:
+        for future in page_futures:
+            page_pdf = future.result()
+            if page_pdf is not None:
+                writer.append(io.BytesIO(page_pdf))
+        writer.write(pdf_filepath)
+        print(f"  Successfully created: {pdf_filename}")
+    except Exception as e:
+        print(f"  Error building PDF {pdf_filename}: {e}")
+
+def create_pdf_from_cache(cache_folder, pdf_output_folder):
+    """
+    Creates PDFs from the text files in the cache folder, with 100 pages per PDF.
+    Every page is laid out in parallel in its own process, then each chunk's pages are merged.
+
+    Args:
+        cache_folder (str): The path to the folder where text files are stored.
+        pdf_output_folder (str): The path to the folder where PDFs will be saved.
+    """
+    text_files = sorted(e.name for e in os.scandir(cache_folder) if e.is_file() and e.name.endswith(".txt"))
+    chunks = [text_files[i:i+PAGES_PER_PDF] for i in range(0, len(text_files), PAGES_PER_PDF)]
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        def submit_chunk(chunk):
+            return [executor.submit(build_page_pdf, cache_folder, filename) for filename in chunk]
+
+        next_futures = submit_chunk(chunks[0]) if chunks else []
+        for n, chunk in enumerate(chunks):
+            page_futures = next_futures
+            # Queue the next chunk so the workers stay busy while this one is merged,
+            # without holding every page of the wiki in memory at once
+            next_futures = submit_chunk(chunks[n + 1]) if n + 1 < len(chunks) else []
+            write_chunk_pdf(chunk, page_futures, pdf_output_folder)
+
+def download_entire_wiki_to_pdf(base_url, refresh_all=False, session=SESSION):
     """
     Downloads an entire wiki, caches it to text files, and converts it into multiple PDFs.
 
     Args:
         base_url (str): The base URL of the wiki.
+        refresh_all (bool): If True, downloads every page again even if it exists in cache.
+        session (requests.Session): The session used for HTTP requests.
     """
     parent_folder = "all_wiki"
     if not os.path.exists(parent_folder):
@@ -204,31 +504,67 @@ def download_entire_wiki_to_pdf(base_url):
     if not os.path.exists(pdf_output_folder):
         os.makedirs(pdf_output_folder)
 
-    page_urls = get_all_page_urls(base_url)
+    page_urls, api_available = get_all_page_urls(base_url, session)
     
     if not page_urls:
         print("No pages found. Aborting.")
         return
 
     # Download/cache all pages
-    for i, page_url in enumerate(page_urls):
-        is_last = (i == len(page_urls) - 1)
-        print(f"Processing page {i+1}/{len(page_urls)}")
-        get_page_content_and_save(page_url, cache_folder, force_download=is_last)
+    api_url = urljoin(base_url, "api.php")
+    # Listing the cache once avoids checking for each page's file on disk
+    cached = set(os.listdir(cache_folder))
+
+    def process_batch(batch):
+        # Cached pages are skipped here rather than read back only to be thrown away
+        pending = [(title, page_url) for title, page_url in batch
+                   if refresh_all or get_cache_filename(title) not in cached]
+        # Only ask the API if it is there at all
+        titles_to_fetch = [title for title, _ in pending]
+        extracts = get_page_extracts(api_url, titles_to_fetch, session) if api_available and titles_to_fetch else {}
+
+        # Pages without an extract fall back to downloading their HTML
+        for title, page_url in pending:
+            get_page_content_and_save(page_url, title, cache_folder, cached, force_download=refresh_all, session=session,
+                                      page_text=extracts.get(title))
+        return len(batch)
+
+    done = 0
+
+    def report(finished):
+        nonlocal done
+        for future in finished:
+            done += future.result()
+            print(f"Processed page {done}/{len(page_urls)}")
+
+    # A new batch is submitted as soon as one finishes, so only a bounded number of
+    # tasks are pending at once while no worker waits on another's slow batch
+    pending = set()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for start in range(0, len(page_urls), EXTRACT_BATCH_SIZE):
+            if len(pending) >= MAX_PENDING_BATCHES:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                report(finished)
+            pending.add(executor.submit(process_batch, page_urls[start:start + EXTRACT_BATCH_SIZE]))
+        report(wait(pending).done)
 
     # Create PDFs from cached files
-    styles = getSampleStyleSheet()
-    create_pdf_from_cache(cache_folder, pdf_output_folder, styles)
+    create_pdf_from_cache(cache_folder, pdf_output_folder)
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
-        url_to_download = sys.argv[1]
-        parsed_url = urlparse(url_to_download)
+    parser = argparse.ArgumentParser(description="Downloads an entire wiki and converts it into PDFs.")
+    parser.add_argument("url", nargs="?", help="Any URL from the wiki.")
+    parser.add_argument("--refresh-all", action="store_true",
+                        help="Download every page again, even if it is already cached.")
+    args = parser.parse_args()
+
+    if args.url:
+        parsed_url = urlparse(args.url)
         base_url = f"{parsed_url.scheme}://{parsed_url.netloc}"
-        
-        download_entire_wiki_to_pdf(base_url)
+
+        download_entire_wiki_to_pdf(base_url, refresh_all=args.refresh_all)
     else:
-        print("Usage: python download.py <any_url_from_the_wiki>")
+        print("Usage: python download.py [--refresh-all] <any_url_from_the_wiki>")
         print("\nNo URL provided. Running with a default example...")
         default_url = "https://vampire.survivors.wiki/"
-        download_entire_wiki_to_pdf(default_url)
+        download_entire_wiki_to_pdf(default_url, refresh_all=args.refresh_all)